@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+import sys
+import time
+import asyncio
+import statistics
+import json
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import datetime
+from pathlib import Path
+import lib.data_io as data_io
+import lib.rate_limit as rate_limit
+
+def use_temp_data_file(tmpdir):
+    data_io.backend = data_io.JsonFileBackend(Path(tmpdir) / "agent_data.json")
+
+def disable_rate_limits():
+    rate_limit.limiter.agent_limit = rate_limit.limiter.team_limit = (0, 0)
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return time.perf_counter() - start
+
+def bench_heartbeats(num_agents=100, iterations=500):
+    from lib.tool_handlers import handle_set_status, handle_heartbeat
+
+    def status_args(i, msg):
+        return {"agent_id": f"agent-{i % num_agents}", "status_message": msg, "task_status": "working"}
+
+    # First pass fills the history lists so every timed pass sees a similar file size
+    timed(lambda i: handle_set_status(status_args(i, f"Warmup {i}")), iterations)
+    results = {"status change": timed(lambda i: handle_set_status(status_args(i, f"Step {i}")), iterations)}
+
+    for i in range(num_agents):
+        handle_set_status(status_args(i, "Steady"))
+
+    results["set_agent_status heartbeat"] = timed(lambda i: handle_set_status(status_args(i, "Steady")), iterations)
+    results["heartbeat tool"] = timed(lambda i: handle_heartbeat({"agent_id": f"agent-{i % num_agents}"}), iterations)
+
+    print(f"Heartbeats ({num_agents} agents, {iterations} calls each):")
+    for name, secs in results.items():
+        print(f"  - {name}: {iterations / secs:,.0f} calls/sec")
+
+def peak_memory(fn):
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+def synthetic_agents(num_agents, num_teams=20):
+    now = datetime.now().isoformat()
+    agents = {}
+    for i in range(num_agents):
+        agents[f"agent-{i}"] = {"status_message": f"Processing batch {i}", "task_status": "working",
+                                "last_checkin": now, "description": "Synthetic agent", "role": "Worker"}
+    agent_to_team = {f"agent-{i}": {"team_id": f"team-{i % num_teams}", "team_name": f"Team {i % num_teams}"}
+                     for i in range(num_agents) if i % 10}
+    return {"agents": agents, "history": {}, "webhooks": []}, agent_to_team
+
+def bench_api_agents(num_agents=10000):
+    import dashboard
+
+    data, dashboard.agent_to_team = synthetic_agents(num_agents)
+    data_io.save_data(data)
+    client = dashboard.app.test_client()
+
+    def embedded():
+        # Previous response shape: every agent copied under its team or unassigned_agents, encoded in one piece
+        agents_list = dashboard.build_agents_list(data)
+        teams = {}
+        for a in agents_list:
+            if a["team"]:
+                teams.setdefault(a["team"], []).append(a)
+        body = {"agents": agents_list, "teams": [{"name": n, "agents": a} for n, a in teams.items()],
+                "unassigned_agents": [a for a in agents_list if not a["team"]]}
+        return len(json.dumps(body).encode())
+
+    def streamed():
+        resp = client.get('/api/agents')
+        return sum(len(chunk) for chunk in resp.response)
+
+    print(f"/api/agents ({num_agents} agents):")
+    for name, fn in [("embedded jsonify", embedded), ("streamed normalized", streamed)]:
+        start = time.perf_counter()
+        size, peak = peak_memory(fn)
+        secs = time.perf_counter() - start
+        print(f"  - {name}: {size / 1024:,.0f} KiB on the wire, {peak / 1024 / 1024:,.1f} MiB peak, {secs:.2f}s")
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def measure_loop_lag(stop, interval=0.01):
+    # How late the event loop wakes up; stays near zero unless something blocks it
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return lags
+
+async def concurrent_checkins(set_status, num_agents, rounds):
+    async def agent(i):
+        latencies = []
+        for r in range(rounds):
+            start = time.perf_counter()
+            await set_status(agent_id=f"agent-{i}", status_message=f"Round {r}", task_status="working")
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(agent(i) for i in range(num_agents)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lags = await lag_task
+    return [lat for agent_lats in results for lat in agent_lats], elapsed, lags
+
+def bench_concurrency(agent_counts=(10, 100, 500), rounds=5, write_delay=0.02, max_p99_writes=10):
+    """
+    Fails if p99 latency exceeds max_p99_writes write times at any agent count. Writes that
+    blocked each other would take about one write time per queued agent (10 s at 500 agents).
+    """
+    import mcp_server
+
+    # A fresh data file, so data left by earlier benchmarks doesn't add to every write,
+    # and a simulated slow disk so the cost of blocking writes is visible
+    saved_backend = data_io.backend
+    tmpdir = tempfile.TemporaryDirectory()
+    use_temp_data_file(tmpdir.name)
+    save = data_io.backend.save
+    def slow_save(data):
+        time.sleep(write_delay)
+        save(data)
+    data_io.backend.save = slow_save
+
+    limit_ms = max_p99_writes * write_delay * 1000
+
+    async def run():
+        print(f"Concurrent set_agent_status ({rounds} check-ins per agent, {write_delay * 1000:.0f} ms per write):")
+        ok = True
+        for num_agents in agent_counts:
+            latencies, elapsed, lags = await concurrent_checkins(mcp_server.set_agent_status, num_agents, rounds)
+            ms = [lat * 1000 for lat in latencies]
+            p99 = percentile(ms, 99)
+            print(f"  - {num_agents} agents: {len(ms) / elapsed:,.0f} calls/sec, "
+                  f"p50 {statistics.median(ms):.1f} ms, p99 {p99:.1f} ms, "
+                  f"max event loop lag {max(lags, default=0) * 1000:.1f} ms")
+            if p99 > limit_ms:
+                print(f"    FAILED: p99 above {limit_ms:.0f} ms")
+                ok = False
+        return ok
+
+    try:
+        return asyncio.run(run())
+    finally:
+        data_io.backend = saved_backend
+        tmpdir.cleanup()
+
+# Current RSS from /proc: ru_maxrss is a peak, and a child process inherits its parent's
+COLD_START_SCRIPT = """
+import time
+import lib.data_io as data_io
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+
+backend = data_io.{backend}
+before = rss_kib()
+start = time.perf_counter()
+data = backend.load()
+loaded = time.perf_counter() - start
+history = data["history"]["agent-0"]
+first_agent = time.perf_counter() - start
+after = rss_kib()
+print(loaded, first_agent, (after - before) / 1024)
+"""
+
+def bench_cold_start(num_agents=2000, entries=100):
+    data, _ = synthetic_agents(num_agents)
+    now = datetime.now().isoformat()
+    data["history"] = {aid: [{"timestamp": now, "status": "working", "message": f"Step {i}", "team": None}
+                             for i in range(entries)] for aid in data["agents"]}
+
+    tmp = data_io.backend.path.parent
+    json_path, snapshot_path = tmp / "cold.json", tmp / "cold.snapshot"
+    data_io.JsonFileBackend(json_path).save(data)
+    data_io.SnapshotFileBackend(snapshot_path, json_path).save(data)
+
+    print(f"Cold start ({num_agents} agents, {entries} history entries each):")
+    for name, path, backend in [("json", json_path, f"JsonFileBackend({str(json_path)!r})"),
+                                ("snapshot", snapshot_path, f"SnapshotFileBackend({str(snapshot_path)!r}, {str(json_path)!r})")]:
+        out = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT.format(backend=backend)], capture_output=True,
+                             text=True, check=True, cwd=Path(__file__).parent).stdout
+        loaded, first_agent, rss = (float(x) for x in out.split())
+        print(f"  - {name}: {path.stat().st_size / 1024 / 1024:,.1f} MiB on disk, load {loaded * 1000:,.0f} ms, "
+              f"load + one agent's history {first_agent * 1000:,.0f} ms, +{rss:,.0f} MiB RSS")
+
+def bench_rate_limit(calls=2000):
+    import lib.tool_handlers as tool_handlers
+
+    limiter = rate_limit.RateLimiter(rate_limit.AGENT_RATE_LIMIT, rate_limit.AGENT_RATE_BURST,
+                                     rate_limit.TEAM_RATE_LIMIT, rate_limit.TEAM_RATE_BURST)
+    saved_limiter, tool_handlers.limiter = tool_handlers.limiter, limiter
+
+    writes = []
+    save = data_io.backend.save
+    def counting_save(data):
+        writes.append(1)
+        save(data)
+    data_io.backend.save = counting_save
+
+    try:
+        # One runaway agent looping on set_agent_status
+        secs = timed(lambda i: tool_handlers.handle_set_status({"agent_id": "runaway", "status_message": f"Loop {i}",
+                                                  "task_status": "working", "team": "Noisy"}), calls)
+        time.sleep(1 / rate_limit.AGENT_RATE_LIMIT + 0.5)
+        stats = limiter.snapshot()
+        last = data_io.load_data()["agents"]["runaway"]["status_message"]
+    finally:
+        data_io.backend.save = save
+        tool_handlers.limiter = saved_limiter
+
+    print(f"Rate limiting ({calls} calls from one agent, {rate_limit.AGENT_RATE_LIMIT:g}/s burst {rate_limit.AGENT_RATE_BURST}):")
+    print(f"  - {calls / secs:,.0f} calls/sec accepted, {len(writes)} file writes")
+    print(f"  - allowed {stats['allowed']}, throttled {stats['throttled']}, coalesced {stats['coalesced']}, flushed {stats['flushed']}")
+    print(f"  - last persisted message: {last}")
+
+BENCHMARKS = {
+    "heartbeats": bench_heartbeats,
+    "api_agents": bench_api_agents,
+    "concurrency": bench_concurrency,
+    "rate_limit": bench_rate_limit,
+    "cold_start": bench_cold_start,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        use_temp_data_file(tmpdir)
+        # Only the rate_limit benchmark is throttled, using its own limiter
+        disable_rate_limits()
+        # A benchmark that checks its results returns False when the check fails
+        failed = [name for name in names if BENCHMARKS[name]() is False]
+    if failed:
+        sys.exit(f"Failed: {', '.join(failed)}")
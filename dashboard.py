@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, jsonify, request
-from datetime import datetime
-from lib.data_io import load_data, save_data
+from flask import Flask, Response, render_template, jsonify, request
+from datetime import datetime, timedelta
+from lib.data_io import load_data, update_data
 from lib.status import get_display_status, calc_team_status, STALE_TIMEOUT
-from lib.history import calc_24h_breakdown
+from lib.history import calc_24h_breakdown, calc_timeseries, calc_team_timeseries, parse_duration, MAX_BUCKETS
 from lib.team_routes import team_bp
 from lib.config_loader import load_team_config, get_team_for_agent
+from lib.json_stream import encode, iter_array, iter_object, chunked
 
 app = Flask(__name__)
 app.register_blueprint(team_bp)
@@ -17,13 +18,23 @@ teams_config, agent_to_team = load_team_config()
 def index():
     return render_template('index.html')
 
+@app.route('/benchmark')
+def benchmark():
+    return render_template('benchmark.html')
+
 @app.route('/api/agents')
 def get_agents():
     data = load_data()
     agents_list = build_agents_list(data)
     teams_list = build_teams_list(agents_list)
-    unassigned = [a for a in agents_list if not a["team"]]
-    return jsonify({"agents": agents_list, "teams": teams_list, "unassigned_agents": unassigned})
+    unassigned = [a["id"] for a in agents_list if not a["team"]]
+    # Teams and unassigned agents reference agents by ID rather than embedding copies
+    body = iter_object([
+        ("agents", iter_array(agents_list)),
+        ("teams", iter_array(teams_list)),
+        ("unassigned_agent_ids", iter_array(unassigned))
+    ])
+    return Response(chunked(body), mimetype='application/json')
 
 def build_agents_list(data):
     agents_list = []
@@ -73,7 +84,7 @@ def build_teams_list(agents_list):
         team_status = calc_team_status(agents)
         teams_list.append({
             "name": name,
-            "agents": agents,
+            "agent_ids": [a["id"] for a in agents],
             "agent_count": len(agents),
             "status": team_status["status"],
             "color": team_status["color"],
@@ -89,43 +100,113 @@ def get_config():
 
 @app.route('/api/agents/<agent_id>', methods=['DELETE'])
 def delete_agent(agent_id):
-    data = load_data()
-    if agent_id in data.get("agents", {}):
+    outcome = {}
+
+    def apply(data):
+        outcome["found"] = agent_id in data["agents"]
+        if not outcome["found"]:
+            return False
         del data["agents"][agent_id]
-        save_data(data)
+
+    update_data(apply)
+    if outcome["found"]:
         return jsonify({"success": True, "message": f"Agent '{agent_id}' deleted successfully"})
     return jsonify({"success": False, "message": f"Agent '{agent_id}' not found"}), 404
 
 @app.route('/api/teams/<team_name>', methods=['DELETE'])
 def delete_team(team_name):
-    data = load_data()
-    agents = data.get("agents", {})
-    to_delete = [aid for aid, info in agents.items() if info.get("team") == team_name]
-
+    outcome = {}
+
+    def apply(data):
+        to_delete = [aid for aid, info in data["agents"].items() if info.get("team") == team_name]
+        outcome["to_delete"] = to_delete
+        if not to_delete:
+            return False
+        for aid in to_delete:
+            del data["agents"][aid]
+
+    update_data(apply)
+    to_delete = outcome["to_delete"]
     if not to_delete:
         return jsonify({"success": False, "message": f"No agents found in team '{team_name}'"}), 404
 
-    for aid in to_delete:
-        del data["agents"][aid]
-
-    save_data(data)
     return jsonify({"success": True, "message": f"Deleted {len(to_delete)} agent(s) from team '{team_name}'", "deleted_count": len(to_delete)})
 
 @app.route('/api/history')
 def get_history():
     data = load_data()
     history = data.get("history", {})
-    processed = {}
+    body = iter_object((key, iter_array(process_history_entries(entries))) for key, entries in history.items())
+    return Response(chunked(body), mimetype='application/json')
 
-    for key, entries in history.items():
-        proc_entries = []
-        for entry in entries:
-            display = get_display_status(entry.get("timestamp", ""), entry.get("status", "unknown"))
-            proc_entry = {**entry, "display_status": display["status"], "display_color": display["color"], "display_label": display["label"]}
-            proc_entries.append(proc_entry)
-        processed[key] = proc_entries
+def process_history_entries(entries):
+    for entry in entries:
+        display = get_display_status(entry.get("timestamp", ""), entry.get("status", "unknown"))
+        yield {**entry, "display_status": display["status"], "display_color": display["color"], "display_label": display["label"]}
+
+@app.route('/api/agents/<agent_id>/timeseries')
+def get_agent_timeseries(agent_id):
+    data = load_data()
+    if agent_id not in data.get("agents", {}):
+        return jsonify({"error": f"Agent '{agent_id}' not found"}), 404
+    return timeseries_response(data["history"].get(agent_id, []), calc_timeseries, {"agent_id": agent_id})
 
-    return jsonify(processed)
+@app.route('/api/teams/<team_name>/timeseries')
+def get_team_timeseries(team_name):
+    data = load_data()
+    members = team_members(data, team_name)
+    if not members:
+        return jsonify({"error": f"No agents found in team '{team_name}'"}), 404
+    hists = [data["history"].get(aid, []) for aid in members]
+    return timeseries_response(hists, calc_team_timeseries, {"team": team_name, "agent_ids": members})
+
+def team_members(data, team_name):
+    """Agents shown in the team (from config.yaml), plus agents that have reported it as their team"""
+    members = {aid for aid, info in data.get("agents", {}).items()
+               if get_team_for_agent(aid, agent_to_team) == team_name or info.get("team") == team_name}
+    members.update(entry.get("agent_id") for entry in data["history"].get(f"team:{team_name}", []))
+    members.discard(None)
+    return sorted(members)
+
+def timeseries_response(hist, calc, header):
+    current_time = datetime.now()
+    try:
+        start, end, bucket_secs = parse_timeseries_args(request.args, current_time)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    series = calc(hist, start, end, bucket_secs, current_time)
+    starts = [(start + timedelta(seconds=i * bucket_secs)).isoformat() for i in range(len(series["checkins"]))]
+    return jsonify({**header, "from": start.isoformat(), "to": end.isoformat(), "bucket_seconds": bucket_secs,
+                    "bucket_starts": starts, **series})
+
+def parse_timeseries_args(args, current_time):
+    """from/to are ISO timestamps (default: the last 24h); bucket is seconds or e.g. '5m', '1h' (default: 1h)"""
+    end = parse_time(args["to"]) if "to" in args else current_time
+    start = parse_time(args["from"]) if "from" in args else end - timedelta(hours=24)
+    bucket_secs = parse_duration(args.get("bucket", "1h"))
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+    if (end - start).total_seconds() / bucket_secs > MAX_BUCKETS:
+        raise ValueError(f"Too many buckets; at most {MAX_BUCKETS} are allowed")
+    return start, end, bucket_secs
+
+def parse_time(value):
+    # Stored timestamps are naive local time, so convert timestamps with an offset to match
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone().replace(tzinfo=None)
+    return ts
+
+@app.route('/api/export')
+def export_data():
+    """Full state as JSON, in the agent_data.json format whichever backend is in use"""
+    data = load_data()
+    history = data.get("history", {})
+    fields = [(key, [encode(value)]) for key, value in data.items() if key != "history"]
+    fields.append(("history", iter_object((key, [encode(history[key])]) for key in history)))
+    return Response(chunked(iter_object(fields)), mimetype='application/json',
+                    headers={"Content-Disposition": "attachment; filename=agent_data.json"})
 
 @app.route('/api/webhooks', methods=['GET'])
 def get_webhooks():
@@ -140,14 +221,18 @@ def add_webhook():
 
     url = webhook_data["url"]
     events = webhook_data.get("events", ["all"])
-    data = load_data()
+    webhook = {"url": url, "events": events, "heartbeats": webhook_data.get("heartbeats", True), "created_at": datetime.now().isoformat()}
+    outcome = {}
 
-    if any(w["url"] == url for w in data["webhooks"]):
-        return jsonify({"error": "Webhook URL already registered"}), 400
+    def apply(data):
+        outcome["exists"] = any(w["url"] == url for w in data["webhooks"])
+        if outcome["exists"]:
+            return False
+        data["webhooks"].append(webhook)
 
-    webhook = {"url": url, "events": events, "created_at": datetime.now().isoformat()}
-    data["webhooks"].append(webhook)
-    save_data(data)
+    update_data(apply)
+    if outcome["exists"]:
+        return jsonify({"error": "Webhook URL already registered"}), 400
 
     return jsonify({"message": "Webhook added successfully", "webhook": webhook}), 201
 
@@ -158,14 +243,19 @@ def remove_webhook():
         return jsonify({"error": "URL is required"}), 400
 
     url = webhook_data["url"]
-    data = load_data()
-    initial_count = len(data["webhooks"])
-    data["webhooks"] = [w for w in data["webhooks"] if w["url"] != url]
+    outcome = {}
+
+    def apply(data):
+        remaining = [w for w in data["webhooks"] if w["url"] != url]
+        outcome["found"] = len(remaining) != len(data["webhooks"])
+        if not outcome["found"]:
+            return False
+        data["webhooks"] = remaining
 
-    if len(data["webhooks"]) == initial_count:
+    update_data(apply)
+    if not outcome["found"]:
         return jsonify({"error": "Webhook URL not found"}), 404
 
-    save_data(data)
     return jsonify({"message": "Webhook removed successfully"})
 
 if __name__ == '__main__':
@@ -1,33 +1,50 @@
 #!/usr/bin/env python3
-import time
+import argparse
+import asyncio
 import random
+from fastmcp import Client
 
-def example_workflow():
+def connect(url=None):
+    """Connect to an MCP server over HTTP, or to mcp_server.py in-process if no URL is given"""
+    if url:
+        return Client(url)
+    from mcp_server import mcp
+    return Client(mcp)
+
+async def set_status(client, aid, status, msg):
+    result = await client.call_tool("set_agent_status", {"agent_id": aid, "status_message": msg, "task_status": status})
+    return result.content[0].text
+
+async def heartbeat(client, aid):
+    result = await client.call_tool("heartbeat", {"agent_id": aid})
+    return result.content[0].text
+
+async def example_workflow(client, pause=2):
     aid = "example-agent-001"
 
     print(f"Agent {aid} starting...")
-    print("Setting status to 'idle'")
-    time.sleep(2)
+    print(await set_status(client, aid, "idle", "Waiting for tasks"))
+    await asyncio.sleep(pause)
 
     print(f"\nAgent {aid} received work")
-    print("Setting status to 'working'")
-    time.sleep(3)
+    print(await set_status(client, aid, "working", "Processing customer requests"))
+    await asyncio.sleep(pause)
 
     print(f"\nAgent {aid} updating progress")
-    print("Updating status message")
-    time.sleep(2)
+    print(await set_status(client, aid, "working", "Processing customer requests (50% complete)"))
+    await asyncio.sleep(pause)
 
     print(f"\nAgent {aid} completed work")
-    print("Setting status back to 'idle'")
+    print(await set_status(client, aid, "idle", "Ready for work"))
 
     print(f"\nAgent {aid} encountered an error")
-    print("Setting status to 'error'")
+    print(await set_status(client, aid, "error", "Database connection failed"))
 
-def heartbeat_example():
+async def heartbeat_example(client, interval=1):
     aid = "heartbeat-agent"
 
     print(f"\nAgent {aid} starting continuous operation...")
-    print("Sending heartbeat every 60 seconds\n")
+    print(f"Reporting its task, then sending a heartbeat every {interval} seconds\n")
 
     tasks = [
         "Analyzing log files",
@@ -40,18 +57,23 @@ def heartbeat_example():
     for i in range(5):
         task = random.choice(tasks)
         print(f"Iteration {i+1}: {task}")
-        time.sleep(1)
+        await set_status(client, aid, "working", task)
+        await asyncio.sleep(interval)
+        print(await heartbeat(client, aid))
 
     print("\nContinuous operation example completed")
 
-if __name__ == "__main__":
-    print("=== Example Agent Workflow ===")
-    example_workflow()
+async def main(url):
+    async with connect(url) as client:
+        print("=== Example Agent Workflow ===")
+        await example_workflow(client)
 
-    print("\n" + "="*50 + "\n")
+        print("\n" + "="*50 + "\n")
 
-    print("=== Continuous Heartbeat Example ===")
-    heartbeat_example()
+        print("=== Continuous Heartbeat Example ===")
+        await heartbeat_example(client)
 
-    print("\n" + "="*50)
-    print("\nNote: Use MCP protocol to call set_agent_status tool")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Example agent reporting its status over MCP")
+    parser.add_argument("--url", help="MCP server URL, e.g. http://localhost:8000/mcp (default: run mcp_server.py in-process)")
+    asyncio.run(main(parser.parse_args().url))
@@ -1,19 +1,424 @@
 from pathlib import Path
 import json
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from lib.json_stream import encode_indented
+from lib import snapshot
+from lib.redis_records import RecordMap, appended_entries
+
+try:
+    import redis
+except ImportError:
+    redis = None
 
 DATA_FILE = Path(__file__).parent.parent / "agent_data.json"
+SNAPSHOT_FILE = Path(os.getenv('SNAPSHOT_FILE', DATA_FILE.with_suffix(".snapshot")))
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'json')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# How many times a Redis update is retried when another replica writes first, and the backoff cap in seconds
+REDIS_MAX_RETRIES = int(os.getenv('REDIS_MAX_RETRIES', '10'))
+REDIS_RETRY_BACKOFF = 0.5
+# Longest a replica serves cached state without hearing of a write, in case an announcement was missed
+REDIS_CACHE_SECONDS = float(os.getenv('REDIS_CACHE_SECONDS', '5'))
 
-def load_data():
-    if not DATA_FILE.exists():
-        return create_empty()
-    try:
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
+class JsonFileBackend:
+    """Single JSON file, shared between processes on one host"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.writer = None
+        # File version and data as of this process's last commit
+        self.seen = None
+
+    def load(self):
+        if not self.path.exists():
+            return create_empty()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                ensure_keys(data)
+                return data
+        except (json.JSONDecodeError, IOError):
+            return create_empty()
+
+    def save(self, data):
+        # Write then rename, so readers never see a half-written file
+        raw = encode_indented(data)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp.write_bytes(raw)
+            os.replace(tmp, self.path)
+        except OSError:
+            # A file bind-mounted on its own (as in docker-compose.yml) can't be replaced by a rename
+            tmp.unlink(missing_ok=True)
+            self.path.write_bytes(raw)
+
+    def update(self, mutate):
+        # Updates are applied by a dedicated writer thread which commits everything
+        # queued since its last write with a single load and save
+        done = threading.Event()
+        request = self.submit(mutate, done.set)
+        done.wait()
+        return result_of(request)
+
+    async def update_async(self, mutate):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request = self.submit(mutate, lambda: loop.call_soon_threadsafe(resolve, future))
+        await future
+        return result_of(request)
+
+    def submit(self, mutate, notify):
+        request = {"mutate": mutate, "notify": notify, "data": None, "error": None}
+        self.ensure_writer()
+        self.queue.put(request)
+        return request
+
+    def ensure_writer(self):
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.write_loop, name="json-writer", daemon=True)
+                self.writer.start()
+
+    def write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.commit(batch)
+
+    def commit(self, batch):
+        data = None
+        try:
+            # Taken before loading, so a write in between makes the version look stale rather than current
+            version = self.version()
+            data = self.load()
+            changed = False
+            for request in batch:
+                try:
+                    changed = request["mutate"](data) is not False or changed
+                except Exception as e:
+                    request["error"] = e
+            if changed:
+                self.save(data)
+                # A write by another process between these two lines would go unnoticed; the file has no
+                # cross-process lock, so such a write could already overwrite ours
+                version = self.version()
+            self.seen = (version, data)
+        except Exception as e:
+            for request in batch:
+                request["error"] = request["error"] or e
+        for request in batch:
+            if request["error"] is None:
+                request["data"] = data
+            try:
+                request["notify"]()
+            except Exception:
+                # The caller has gone away (e.g. its event loop was closed); keep the writer alive for everyone else
+                pass
+
+    def version(self):
+        # Changes whenever any process replaces or rewrites the file
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def peek_agent(self, aid):
+        seen = self.seen
+        if seen is None or seen[0] is None or seen[0] != self.version():
+            return None
+        return seen[1]["agents"].get(aid), seen[1]["webhooks"]
+
+class SnapshotFileBackend(JsonFileBackend):
+    """
+    Compact msgpack snapshot (see lib/snapshot.py). Loading decodes agents and webhooks only;
+    each agent's history is decoded when first accessed. Starts from the JSON file if no snapshot exists yet.
+    """
+
+    def __init__(self, path, json_path):
+        super().__init__(path)
+        self.json_backend = JsonFileBackend(json_path)
+
+    def load(self):
+        if not self.path.exists():
+            return self.json_backend.load()
+        try:
+            data = snapshot.read_snapshot(self.path)
             ensure_keys(data)
             return data
-    except (json.JSONDecodeError, IOError):
+        except (ValueError, KeyError, TypeError, IOError):
+            return create_empty()
+
+    def save(self, data):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, 'wb') as f:
+            snapshot.write_snapshot(f, data)
+        # Always a rename: readers may still have the previous snapshot memory-mapped
+        os.replace(tmp, self.path)
+
+class RedisBackend:
+    """
+    State stored one record per key, so any number of dashboard and MCP replicas can share it:
+    each agent under <prefix>:agent:<id> (IDs in the <prefix>:agents set), each history list under
+    <prefix>:history:<key> (keys in <prefix>:history_keys), and webhooks under <prefix>:webhooks.
+
+    An update fetches only the records its mutation touches, WATCHing agents and webhooks, and writes
+    back only the ones it changed, so check-ins for different agents neither conflict nor send the whole
+    fleet. History lists are append-only: new entries are pushed and trimmed without being watched.
+
+    Every write is announced on a pub/sub channel. Each replica caches the full state for reads until
+    an announcement invalidates it, or for REDIS_CACHE_SECONDS in case an announcement was missed.
+    """
+
+    def __init__(self, client, prefix="agent_dashboard"):
+        self.client = client
+        self.prefix = prefix
+        self.agents_key = f"{prefix}:agents"
+        self.history_keys = f"{prefix}:history_keys"
+        self.webhooks_key = f"{prefix}:webhooks"
+        self.channel = f"{prefix}:updates"
+        self.cached = None
+        self.cached_at = 0.0
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def agent_key(self, aid):
+        return f"{self.prefix}:agent:{aid}"
+
+    def history_key(self, key):
+        return f"{self.prefix}:history:{key}"
+
+    def load(self):
+        self.ensure_listener()
+        raw = self.cached
+        if raw is None or time.monotonic() - self.cached_at > REDIS_CACHE_SECONDS:
+            generation = self.generation
+            raw = self.read_all()
+            # Only cache if no write was announced while we were reading
+            if generation == self.generation:
+                self.cached, self.cached_at = raw, time.monotonic()
+        return decode(raw)
+
+    def read_all(self):
+        # Assembled into one JSON document, so a load decodes it in a single pass
+        ids = sorted(member.decode() for member in self.client.smembers(self.agents_key))
+        agents = self.client.mget([self.agent_key(aid) for aid in ids]) if ids else []
+        keys = sorted(member.decode() for member in self.client.smembers(self.history_keys))
+        with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.lrange(self.history_key(key), 0, -1)
+            histories = pipe.execute()
+        webhooks = self.client.get(self.webhooks_key) or b"[]"
+
+        def fields(pairs):
+            return b"{" + b",".join(json.dumps(key).encode() + b":" + value for key, value in pairs) + b"}"
+
+        return (b'{"agents":' + fields((aid, raw) for aid, raw in zip(ids, agents) if raw is not None)
+                + b',"history":' + fields((key, b"[" + b",".join(entries) + b"]") for key, entries in zip(keys, histories))
+                + b',"webhooks":' + webhooks + b"}")
+
+    def save(self, data):
+        ids = self.client.smembers(self.agents_key)
+        keys = self.client.smembers(self.history_keys)
+        with self.client.pipeline() as pipe:
+            stale = [self.agent_key(aid.decode()) for aid in ids] + [self.history_key(key.decode()) for key in keys]
+            pipe.delete(self.agents_key, self.history_keys, self.webhooks_key, *stale)
+            for aid, agent in data.get("agents", {}).items():
+                pipe.set(self.agent_key(aid), json.dumps(agent))
+                pipe.sadd(self.agents_key, aid)
+            for key, entries in data.get("history", {}).items():
+                if entries:
+                    pipe.rpush(self.history_key(key), *(json.dumps(entry) for entry in entries))
+                    pipe.sadd(self.history_keys, key)
+            pipe.set(self.webhooks_key, json.dumps(data.get("webhooks", [])))
+            pipe.execute()
+        self.publish()
+
+    def update(self, mutate):
+        # Optimistic transaction: retried, after a random exponential backoff, if another replica
+        # writes a record we read before we commit. Raises WatchError once REDIS_MAX_RETRIES is exceeded.
+        with self.client.pipeline() as pipe:
+            for attempt in range(REDIS_MAX_RETRIES + 1):
+                try:
+                    data = self.transact(pipe, mutate)
+                    return data
+                except redis.WatchError:
+                    if attempt == REDIS_MAX_RETRIES:
+                        raise
+                    time.sleep(random.uniform(0, min(REDIS_RETRY_BACKOFF, 0.005 * 2 ** attempt)))
+
+    def transact(self, pipe, mutate):
+        def fetch_agent(aid):
+            pipe.watch(self.agent_key(aid))
+            raw = pipe.get(self.agent_key(aid))
+            return json.loads(raw) if raw is not None else None
+
+        def fetch_all_agents():
+            ids = [member.decode() for member in pipe.smembers(self.agents_key)]
+            if not ids:
+                return []
+            pipe.watch(*(self.agent_key(aid) for aid in ids))
+            raws = pipe.mget([self.agent_key(aid) for aid in ids])
+            return [(aid, json.loads(raw)) for aid, raw in zip(ids, raws) if raw is not None]
+
+        def fetch_history(key):
+            return [json.loads(entry) for entry in pipe.lrange(self.history_key(key), 0, -1)] or None
+
+        def fetch_all_history():
+            keys = [member.decode() for member in pipe.smembers(self.history_keys)]
+            return [(key, fetch_history(key)) for key in keys]
+
+        pipe.watch(self.webhooks_key)
+        webhooks_raw = pipe.get(self.webhooks_key) or b"[]"
+        agents = RecordMap(fetch_agent, fetch_all_agents)
+        history = RecordMap(fetch_history, fetch_all_history)
+        data = {"agents": agents, "history": history, "webhooks": json.loads(webhooks_raw)}
+
+        if mutate(data) is False:
+            pipe.reset()
+            return data
+        agent_changes = list(agents.changes())
+        history_changes = list(history.changes())
+        webhooks_changed = data["webhooks"] != json.loads(webhooks_raw)
+        if not (agent_changes or history_changes or webhooks_changed):
+            pipe.reset()
+            return data
+
+        pipe.multi()
+        for aid, _, agent in agent_changes:
+            if agent is None:
+                pipe.delete(self.agent_key(aid))
+                pipe.srem(self.agents_key, aid)
+            else:
+                pipe.set(self.agent_key(aid), json.dumps(agent))
+                pipe.sadd(self.agents_key, aid)
+        for key, old, entries in history_changes:
+            self.write_history(pipe, key, old or [], entries or [])
+        if webhooks_changed:
+            pipe.set(self.webhooks_key, json.dumps(data["webhooks"]))
+        pipe.execute()
+        self.publish()
+        return data
+
+    def write_history(self, pipe, key, old, entries):
+        hkey = self.history_key(key)
+        if not entries:
+            pipe.delete(hkey)
+            pipe.srem(self.history_keys, key)
+            return
+        appended = appended_entries(old, entries)
+        if appended is None:
+            pipe.delete(hkey)
+            appended, old = entries, []
+        if appended:
+            pipe.rpush(hkey, *(json.dumps(entry) for entry in appended))
+        if len(old) + len(appended) > len(entries):
+            pipe.ltrim(hkey, -len(entries), -1)
+        pipe.sadd(self.history_keys, key)
+
+    async def update_async(self, mutate):
+        return await asyncio.get_running_loop().run_in_executor(None, self.update, mutate)
+
+    def peek_agent(self, aid):
+        # Always current: only this agent's record and the webhooks are read
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(self.agent_key(aid))
+            pipe.get(self.webhooks_key)
+            agent, webhooks = pipe.execute()
+        return (json.loads(agent) if agent is not None else None), json.loads(webhooks or b"[]")
+
+    def publish(self):
+        self.invalidate()
+        self.client.publish(self.channel, "changed")
+
+    def ensure_listener(self):
+        with self.lock:
+            if self.listener is not None:
+                return
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self.invalidate})
+            self.listener = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self.listener_failed)
+
+    def listener_failed(self, error, pubsub, thread):
+        # Announcements may be lost while disconnected: drop the cache and resubscribe on the next load
+        thread.stop()
+        with self.lock:
+            self.listener = None
+        self.invalidate()
+
+    def invalidate(self, message=None):
+        self.generation += 1
+        self.cached = None
+
+def resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+def result_of(request):
+    if request["error"] is not None:
+        raise request["error"]
+    return request["data"]
+
+def decode(raw):
+    if raw is None:
+        return create_empty()
+    try:
+        data = json.loads(raw)
+        ensure_keys(data)
+        return data
+    except (json.JSONDecodeError, TypeError):
         return create_empty()
 
+def create_backend():
+    if STATE_BACKEND == 'redis':
+        if redis is None:
+            raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        return RedisBackend(redis.Redis.from_url(REDIS_URL))
+    if STATE_BACKEND == 'snapshot':
+        if snapshot.msgpack is None:
+            raise RuntimeError("STATE_BACKEND=snapshot requires the 'msgpack' package (pip install msgpack)")
+        return SnapshotFileBackend(SNAPSHOT_FILE, DATA_FILE)
+    return JsonFileBackend(DATA_FILE)
+
+backend = create_backend()
+
+def load_data():
+    return backend.load()
+
+def save_data(data):
+    backend.save(data)
+
+def update_data(mutate):
+    """
+    Load, mutate and save the data as one step, safe against concurrent writers.
+    mutate(data) edits data in place and may be called more than once; returning False skips the write.
+    Returns the resulting data.
+    """
+    return backend.update(mutate)
+
+def peek_agent(aid):
+    """
+    The stored agent (None if absent) and webhooks, if the backend can tell they are current
+    without loading all the data; otherwise None
+    """
+    return backend.peek_agent(aid)
+
+async def update_data_async(mutate):
+    """Like update_data, but waits without blocking the event loop or holding a thread"""
+    return await backend.update_async(mutate)
+
 def create_empty():
     return {"agents": {}, "history": {}, "webhooks": []}
 
@@ -22,7 +427,3 @@ def ensure_keys(data):
         data["webhooks"] = []
     if "history" not in data:
         data["history"] = {}
-
-def save_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
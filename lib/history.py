@@ -1,4 +1,10 @@
 from datetime import datetime, timedelta
+from bisect import bisect_left
+import math
+import re
+
+MAX_BUCKETS = 1000
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
 
 def calc_24h_breakdown(agent_id, history, current_status, current_time):
     breakdown = init_breakdown()
@@ -78,3 +84,75 @@ def calc_percentages(timeline, cutoff, breakdown):
         breakdown[status] = round((breakdown[status] / total_secs) * 100, 1)
 
     return breakdown
+
+def parse_duration(value):
+    """Parse a bucket size such as '300', '5m', '1h' or '1d' into seconds"""
+    match = re.fullmatch(r"(\d+)([smhd]?)", str(value).strip())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid duration: {value}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
+
+def entry_time(entry):
+    try:
+        return datetime.fromisoformat(entry["timestamp"])
+    except (ValueError, TypeError, KeyError):
+        return datetime.min
+
+def calc_timeseries(hist, start, end, bucket_secs, current_time):
+    """
+    Per-bucket seconds spent in each status and number of check-ins between start and end.
+    hist must be in chronological order, so the window is located by bisection.
+    """
+    num = math.ceil((end - start).total_seconds() / bucket_secs)
+    series = init_series(num)
+    lo = bisect_left(hist, start, key=entry_time)
+    hi = bisect_left(hist, end, key=entry_time)
+
+    status = get_category(hist[lo - 1].get("status", "unknown"), {}) if lo else "offline"
+    cursor = start
+    stop = min(end, current_time)
+
+    for entry in hist[lo:hi]:
+        ts = entry_time(entry)
+        add_duration(series, start, bucket_secs, cursor, min(ts, stop), status)
+        series["checkins"][bucket_index(start, bucket_secs, ts)] += 1
+        status = get_category(entry.get("status", "unknown"), {})
+        cursor = ts
+
+    add_duration(series, start, bucket_secs, cursor, stop, status)
+    return round_series(series)
+
+def calc_team_timeseries(member_hists, start, end, bucket_secs, current_time):
+    """
+    Team series are the sum of each member's series, so durations are in agent-seconds.
+    Built from each member's own history: the shared team history only keeps the latest entries across all members.
+    """
+    num = math.ceil((end - start).total_seconds() / bucket_secs)
+    total = init_series(num)
+
+    for entries in member_hists:
+        series = calc_timeseries(entries, start, end, bucket_secs, current_time)
+        for status, values in series["durations"].items():
+            total["durations"][status] = [a + b for a, b in zip(total["durations"][status], values)]
+        total["checkins"] = [a + b for a, b in zip(total["checkins"], series["checkins"])]
+
+    return round_series(total)
+
+def init_series(num):
+    return {"durations": {status: [0.0] * num for status in init_breakdown()}, "checkins": [0] * num}
+
+def bucket_index(origin, bucket_secs, ts):
+    return int((ts - origin).total_seconds() // bucket_secs)
+
+def add_duration(series, origin, bucket_secs, begin, finish, status):
+    while begin < finish:
+        idx = bucket_index(origin, bucket_secs, begin)
+        bucket_end = origin + timedelta(seconds=(idx + 1) * bucket_secs)
+        seg_end = min(finish, bucket_end)
+        series["durations"][status][idx] += (seg_end - begin).total_seconds()
+        begin = seg_end
+
+def round_series(series):
+    for status, values in series["durations"].items():
+        series["durations"][status] = [round(v, 1) for v in values]
+    return series
@@ -0,0 +1,50 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 64 * 1024
+
+def encode(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def encode_indented(obj):
+    # json.dump falls back to its pure-Python encoder when indenting, which holds the GIL for long stretches
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+def iter_array(items):
+    yield b"["
+    for i, item in enumerate(items):
+        if i:
+            yield b","
+        yield encode(item)
+    yield b"]"
+
+def iter_object(fields):
+    """
+    Encode an object one field at a time.
+    fields is an iterable of (key, pieces) pairs, where pieces is an iterable of encoded bytes
+    """
+    yield b"{"
+    for i, (key, pieces) in enumerate(fields):
+        if i:
+            yield b","
+        yield encode(key) + b":"
+        yield from pieces
+    yield b"}"
+
+def chunked(pieces, size=CHUNK_SIZE):
+    buf = bytearray()
+    for piece in pieces:
+        buf += piece
+        if len(buf) >= size:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+# Check-ins per second allowed for each agent and each team, and how many may arrive in a burst (0 disables)
+AGENT_RATE_LIMIT = float(os.getenv('AGENT_RATE_LIMIT', '2'))
+AGENT_RATE_BURST = int(os.getenv('AGENT_RATE_BURST', '10'))
+TEAM_RATE_LIMIT = float(os.getenv('TEAM_RATE_LIMIT', '20'))
+TEAM_RATE_BURST = int(os.getenv('TEAM_RATE_BURST', '100'))
+# Throttled counts are kept for at most this many agents and teams each, the most throttled first
+STATS_MAX_KEYS = 1000
+# How often buckets that have refilled completely are dropped
+PRUNE_SECONDS = 60
+
+class TokenBucket:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def full(self, now):
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+class RateLimiter:
+    """
+    Per-agent and per-team token buckets. A throttled check-in is held as the agent's
+    pending update; later throttled check-ins replace it, and it is flushed once the
+    buckets refill unless an allowed check-in supersedes it first. Pending updates are
+    flushed in order of when they are due by a single scheduler thread.
+    """
+
+    def __init__(self, agent_rate, agent_burst, team_rate, team_burst):
+        self.agent_limit = (agent_rate, agent_burst)
+        self.team_limit = (team_rate, team_burst)
+        self.agent_buckets = {}
+        self.team_buckets = {}
+        self.pending = {}
+        self.due = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.scheduler = None
+        self.pruned = time.monotonic()
+        self.stats = {"allowed": 0, "throttled": 0, "coalesced": 0, "flushed": 0, "agents": {}, "teams": {}}
+
+    def buckets_for(self, agent_id, team, now):
+        buckets = []
+        if self.agent_limit[0] > 0:
+            buckets.append(get_bucket(self.agent_buckets, agent_id, self.agent_limit, now))
+        if team and self.team_limit[0] > 0:
+            buckets.append(get_bucket(self.team_buckets, team, self.team_limit, now))
+        return buckets
+
+    def allow(self, agent_id, team, supersedes=True):
+        """Take a token from each bucket if all have one. An allowed check-in that supersedes replaces the pending update."""
+        now = time.monotonic()
+        with self.lock:
+            if now - self.pruned > PRUNE_SECONDS:
+                self.prune(now)
+            buckets = self.buckets_for(agent_id, team, now)
+            for bucket in buckets:
+                bucket.refill(now)
+            if any(bucket.tokens < 1 for bucket in buckets):
+                return False
+            for bucket in buckets:
+                bucket.tokens -= 1
+            if supersedes and self.pending.pop(agent_id, None) is not None:
+                self.stats["coalesced"] += 1
+            self.stats["allowed"] += 1
+            return True
+
+    def throttle(self, agent_id, team, args, flush):
+        """
+        Record a throttled check-in. If args is given it becomes the agent's pending update,
+        and flush(args) is called on the scheduler thread once the buckets allow it, so it should return quickly.
+        """
+        with self.lock:
+            self.stats["throttled"] += 1
+            count_by(self.stats["agents"], agent_id)
+            if team:
+                count_by(self.stats["teams"], team)
+            if args is None:
+                return
+            scheduled = agent_id in self.pending
+            if scheduled:
+                self.stats["coalesced"] += 1
+            self.pending[agent_id] = (args, team)
+            if scheduled:
+                return
+            now = time.monotonic()
+            delay = max((b.wait_time() for b in self.buckets_for(agent_id, team, now)), default=0.0)
+            heapq.heappush(self.due, (now + delay, next(self.sequence), agent_id, flush))
+            self.ensure_scheduler()
+            self.wakeup.notify()
+
+    def ensure_scheduler(self):
+        if self.scheduler is None:
+            self.scheduler = threading.Thread(target=self.run_scheduler, name="rate-limit-flush", daemon=True)
+            self.scheduler.start()
+
+    def run_scheduler(self):
+        with self.lock:
+            while True:
+                if not self.due:
+                    self.wakeup.wait()
+                    continue
+                wait = self.due[0][0] - time.monotonic()
+                if wait > 0:
+                    self.wakeup.wait(wait)
+                    continue
+                _, _, agent_id, flush = heapq.heappop(self.due)
+                self.lock.release()
+                try:
+                    self.flush_pending(agent_id, flush)
+                except Exception as e:
+                    print(f"Flushing rate limited update for {agent_id} failed: {str(e)}")
+                finally:
+                    self.lock.acquire()
+
+    def flush_pending(self, agent_id, flush):
+        now = time.monotonic()
+        with self.lock:
+            if agent_id not in self.pending:
+                return
+            args, team = self.pending.pop(agent_id)
+            # Flushed updates draw on the same buckets, even if that leaves them briefly negative
+            for bucket in self.buckets_for(agent_id, team, now):
+                bucket.refill(now)
+                bucket.tokens -= 1
+            self.stats["flushed"] += 1
+        flush(args)
+
+    def prune(self, now):
+        # A bucket that has refilled to its burst behaves exactly like a new one
+        for buckets in (self.agent_buckets, self.team_buckets):
+            for key in [key for key, bucket in buckets.items() if bucket.full(now)]:
+                del buckets[key]
+        self.pruned = now
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, "pending": len(self.pending),
+                    "agents": most_throttled(self.stats["agents"]), "teams": most_throttled(self.stats["teams"])}
+
+def get_bucket(buckets, key, limit, now):
+    if key not in buckets:
+        buckets[key] = TokenBucket(limit[0], limit[1], now)
+    return buckets[key]
+
+def count_by(counts, key):
+    counts[key] = counts.get(key, 0) + 1
+    if len(counts) > 2 * STATS_MAX_KEYS:
+        # Keys dropped here start again from zero if they are throttled again
+        top = most_throttled(counts)
+        counts.clear()
+        counts.update(top)
+
+def most_throttled(counts):
+    return dict(heapq.nlargest(STATS_MAX_KEYS, counts.items(), key=lambda item: item[1]))
+
+limiter = RateLimiter(AGENT_RATE_LIMIT, AGENT_RATE_BURST, TEAM_RATE_LIMIT, TEAM_RATE_BURST)
@@ -0,0 +1,72 @@
+from collections.abc import MutableMapping
+import json
+
+class RecordMap(MutableMapping):
+    """
+    One kind of record (agents, or history lists) as seen by a single Redis update. Each record is
+    fetched the first time the mutation touches it; changes() lists the ones it added, altered or deleted.
+    fetch(key) returns the stored value or None; fetch_all() returns every stored key and value.
+    """
+
+    def __init__(self, fetch, fetch_all):
+        self.fetch = fetch
+        self.fetch_all = fetch_all
+        self.values = {}
+        self.fetched = {}
+        self.complete = False
+
+    def value(self, key):
+        if key not in self.values:
+            self.remember(key, self.fetch(key))
+        return self.values[key]
+
+    def remember(self, key, value):
+        self.values[key] = value
+        self.fetched[key] = json.dumps(value)
+
+    def __getitem__(self, key):
+        value = self.value(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.value(key)
+        self.values[key] = value
+
+    def __delitem__(self, key):
+        if self.value(key) is None:
+            raise KeyError(key)
+        self.values[key] = None
+
+    def __contains__(self, key):
+        return self.value(key) is not None
+
+    def __iter__(self):
+        if not self.complete:
+            # Fetched in one go rather than one round trip per record
+            for key, value in self.fetch_all():
+                if key not in self.values:
+                    self.remember(key, value)
+            self.complete = True
+        return iter([key for key, value in self.values.items() if value is not None])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def changes(self):
+        """(key, value as fetched, value now) for every record the mutation changed; None means absent"""
+        for key, value in self.values.items():
+            encoded = json.dumps(value)
+            if encoded != self.fetched[key]:
+                yield key, json.loads(self.fetched[key]), value
+
+def appended_entries(old, new):
+    """
+    The entries appended to old to produce new, which may also have been trimmed from the front,
+    or None if new doesn't start with a suffix of old and has to replace it
+    """
+    for kept in range(min(len(old), len(new)), 0, -1):
+        if new[:kept] == old[len(old) - kept:]:
+            return new[kept:]
+    return None if old else new
@@ -0,0 +1,88 @@
+from collections.abc import MutableMapping
+import mmap
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Layout: MAGIC, header length (uint64), msgpack header, then one msgpack blob per history key.
+# The header holds everything except history, plus each history key's blob offset and length,
+# so a load only decodes the header and history is decoded per key on first access.
+MAGIC = b"ADSNAP1\n"
+LENGTH = struct.Struct("<Q")
+
+class LazyHistory(MutableMapping):
+    """History mapping that decodes each key's entries from the snapshot the first time it is read"""
+
+    def __init__(self, buf, index):
+        self.buf = buf
+        self.index = index
+        self.loaded = {}
+
+    def __getitem__(self, key):
+        if key not in self.loaded:
+            if key not in self.index:
+                raise KeyError(key)
+            start, length = self.index[key]
+            self.loaded[key] = msgpack.unpackb(self.buf[start:start + length])
+        return self.loaded[key]
+
+    def __setitem__(self, key, value):
+        self.loaded[key] = value
+        self.index.setdefault(key, None)
+
+    def __delitem__(self, key):
+        del self.index[key]
+        self.loaded.pop(key, None)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def raw(self, key):
+        # Entries that were never read are copied to the next snapshot without decoding
+        if key in self.loaded:
+            return msgpack.packb(self.loaded[key])
+        start, length = self.index[key]
+        return self.buf[start:start + length]
+
+def read_snapshot(path):
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buf) < len(MAGIC) + LENGTH.size or buf[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an agent dashboard snapshot")
+    pos = len(MAGIC)
+    (header_len,) = LENGTH.unpack_from(buf, pos)
+    pos += LENGTH.size
+    header = msgpack.unpackb(buf[pos:pos + header_len])
+    base = pos + header_len
+
+    data = header["data"]
+    index = {key: (base + offset, length) for key, (offset, length) in header["history_index"].items()}
+    data["history"] = LazyHistory(buf, index)
+    return data
+
+def write_snapshot(f, data):
+    history = data.get("history", {})
+    blobs = []
+    index = {}
+    offset = 0
+    for key in history:
+        blob = history.raw(key) if isinstance(history, LazyHistory) else msgpack.packb(history[key])
+        index[key] = (offset, len(blob))
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = msgpack.packb({"data": {k: v for k, v in data.items() if k != "history"}, "history_index": index})
+    f.write(MAGIC)
+    f.write(LENGTH.pack(len(header)))
+    f.write(header)
+    for blob in blobs:
+        f.write(blob)
@@ -1,36 +1,189 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from mcp.types import TextContent
+import asyncio
 import json
-from lib.data_io import load_data, save_data
+import os
+from lib.data_io import load_data, update_data, update_data_async, peek_agent
 from lib.webhook import trigger
+from lib.rate_limit import limiter
+from lib.config_loader import load_team_config, get_team_for_agent
+
+# Heartbeats arriving within this many seconds of the stored check-in are not written
+HEARTBEAT_WRITE_SECONDS = int(os.getenv('HEARTBEAT_WRITE_SECONDS', '10'))
+STORAGE_IO_THREADS = int(os.getenv('STORAGE_IO_THREADS', '8'))
+
+io_executor = ThreadPoolExecutor(max_workers=STORAGE_IO_THREADS, thread_name_prefix="storage-io")
+
+# Team rate limits apply to the teams the dashboard shows (config.yaml), not the team an agent reports
+teams_config, agent_to_team = load_team_config()
+
+async def run_handler(handler, args):
+    """Run a blocking handler (reads) on the storage I/O threads so the event loop keeps serving other agents"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, handler, args)
 
 def handle_set_status(args):
+    if not limiter.allow(args["agent_id"], limit_team(args["agent_id"])):
+        return throttle_set_status(args)
+    if cached_set_status(args):
+        return set_status_response(args)
+    return apply_set_status(args)
+
+async def handle_set_status_async(args):
+    if not limiter.allow(args["agent_id"], limit_team(args["agent_id"])):
+        return throttle_set_status(args)
+    if cached_set_status(args):
+        return set_status_response(args)
+    apply, finish = set_status_update(args)
+    return finish(await update_data_async(apply))
+
+def apply_set_status(args):
+    apply, finish = set_status_update(args)
+    return finish(update_data(apply))
+
+def flush_set_status(args):
+    # Handed to the storage I/O threads so a slow write doesn't hold up other agents' flushes
+    io_executor.submit(apply_set_status, args)
+
+def throttle_set_status(args):
+    aid = args["agent_id"]
+    limiter.throttle(aid, limit_team(aid), args, flush_set_status)
+    return [TextContent(type="text", text=f"Agent '{aid}' is checking in too often. This update was rate limited and will be saved shortly unless a newer one replaces it.")]
+
+def limit_team(aid):
+    return get_team_for_agent(aid, agent_to_team)
+
+def cached_set_status(args):
+    fields = (args["status_message"], args["task_status"], args.get("team"), args.get("description"), args.get("role"))
+    return heartbeat_without_write(args["agent_id"], datetime.now().isoformat(), fields)
+
+def set_status_response(args):
+    text = format_response(args["agent_id"], args["task_status"], args["status_message"], args.get("team"),
+                           args.get("description"), args.get("role"))
+    return [TextContent(type="text", text=text)]
+
+def set_status_update(args):
+    """Returns the mutation to apply to the stored data, and a function that takes the saved data and produces the response"""
     agent_id = args["agent_id"]
     status_msg = args["status_message"]
     task_status = args["task_status"]
     team = args.get("team")
     desc = args.get("description")
     role = args.get("role")
+    now = datetime.now().isoformat()
+    outcome = {}
 
-    data = load_data()
-    ensure_history(data)
+    def apply(data):
+        ensure_history(data)
+        agent = data["agents"].get(agent_id)
+        outcome["heartbeat"] = is_heartbeat(agent, status_msg, task_status, team, desc, role)
+        if outcome["heartbeat"]:
+            return bump_checkin(agent, now)
+
+        outcome["is_new"] = agent is None
+        outcome["old_status"] = (agent or {}).get("task_status")
+        update_agent(data, agent_id, status_msg, task_status, team, desc, role, now)
+        add_history(data, agent_id, task_status, status_msg, team, desc, role, now)
+        if team:
+            add_team_history(data, team, agent_id, task_status, status_msg, desc, role, now)
 
-    is_new = agent_id not in data["agents"]
-    old_status = data["agents"].get(agent_id, {}).get("task_status")
-    changed = not is_new and old_status != task_status
+    def finish(data):
+        if outcome["heartbeat"]:
+            send_heartbeat_webhooks(data["agents"][agent_id], agent_id, now, data["webhooks"])
+        else:
+            is_new, old_status = outcome["is_new"], outcome["old_status"]
+            changed = not is_new and old_status != task_status
+            webhook_data = build_webhook_data(agent_id, status_msg, task_status, team, desc, role, now, old_status, changed)
+            send_webhooks(is_new, changed, task_status, webhook_data, data["webhooks"])
+
+        return set_status_response(args)
+
+    return apply, finish
+
+def handle_heartbeat(args):
+    # A heartbeat must not replace a throttled status update that is still waiting to be saved
+    if not limiter.allow(args["agent_id"], None, supersedes=False):
+        return throttle_heartbeat(args)
+    if heartbeat_without_write(args["agent_id"], datetime.now().isoformat()):
+        return heartbeat_response(args["agent_id"])
+    apply, finish = heartbeat_update(args)
+    return finish(update_data(apply))
+
+async def handle_heartbeat_async(args):
+    # A heartbeat must not replace a throttled status update that is still waiting to be saved
+    if not limiter.allow(args["agent_id"], None, supersedes=False):
+        return throttle_heartbeat(args)
+    if heartbeat_without_write(args["agent_id"], datetime.now().isoformat()):
+        return heartbeat_response(args["agent_id"])
+    apply, finish = heartbeat_update(args)
+    return finish(await update_data_async(apply))
+
+def throttle_heartbeat(args):
+    # Dropped outright: a heartbeat carries nothing that the agent's next check-in won't
+    aid = args["agent_id"]
+    limiter.throttle(aid, None, None, None)
+    return [TextContent(type="text", text=f"Agent '{aid}' heartbeat received (rate limited)")]
+
+def heartbeat_update(args):
+    aid = args["agent_id"]
     now = datetime.now().isoformat()
+    outcome = {}
 
-    update_agent(data, agent_id, status_msg, task_status, team, desc, role, now)
-    add_history(data, agent_id, task_status, status_msg, team, desc, role, now)
-    if team:
-        add_team_history(data, team, agent_id, task_status, status_msg, desc, role, now)
+    def apply(data):
+        agent = data["agents"].get(aid)
+        outcome["found"] = agent is not None
+        return outcome["found"] and bump_checkin(agent, now)
+
+    def finish(data):
+        if not outcome["found"]:
+            return [TextContent(type="text", text=f"Agent '{aid}' not found")]
+        send_heartbeat_webhooks(data["agents"][aid], aid, now, data["webhooks"])
+        return heartbeat_response(aid)
+
+    return apply, finish
+
+def heartbeat_without_write(aid, now, fields=None):
+    """
+    Send the heartbeat webhooks and return True if the stored agent is known to be current, isn't due to be
+    written and, for set_agent_status, matches fields (message, status, team, description, role)
+    """
+    peeked = peek_agent(aid)
+    if peeked is None:
+        return False
+    agent, webhooks = peeked
+    if agent is None or heartbeat_due(agent.get("last_checkin"), now):
+        return False
+    if fields is not None and not is_heartbeat(agent, *fields):
+        return False
+    send_heartbeat_webhooks(agent, aid, now, webhooks)
+    return True
 
-    save_data(data)
+def heartbeat_response(aid):
+    return [TextContent(type="text", text=f"Agent '{aid}' heartbeat received")]
 
-    webhook_data = build_webhook_data(agent_id, status_msg, task_status, team, desc, role, now, old_status, changed)
-    send_webhooks(is_new, changed, task_status, webhook_data)
+def is_heartbeat(agent, msg, status, team, desc, role):
+    # A check-in that would leave the stored agent unchanged apart from last_checkin
+    if agent is None:
+        return False
+    return (agent.get("status_message") == msg and agent.get("task_status") == status
+            and agent.get("team") == (team or None) and agent.get("description") == (desc or None)
+            and agent.get("role") == (role or None))
 
-    return [TextContent(type="text", text=format_response(agent_id, task_status, status_msg, team, desc, role))]
+def bump_checkin(agent, now):
+    if not heartbeat_due(agent.get("last_checkin"), now):
+        return False
+    agent["last_checkin"] = now
+    return True
+
+def send_heartbeat_webhooks(agent, aid, now, webhooks):
+    # Sent whether or not the check-in was written; subscribers opt out with "heartbeats": false
+    if not webhooks:
+        return
+    wh_data = build_webhook_data(aid, agent.get("status_message"), agent.get("task_status"), agent.get("team"),
+                                 agent.get("description"), agent.get("role"), now, None, False)
+    wh_data["heartbeat"] = True
+    trigger("status_update", wh_data, webhooks, heartbeat=True)
 
 def ensure_history(data):
     if "history" not in data:
@@ -74,6 +227,13 @@ def add_team_history(data, team, aid, status, msg, desc, role, now):
     if len(data["history"][key]) > 100:
         data["history"][key] = data["history"][key][-100:]
 
+def heartbeat_due(last_checkin, now):
+    try:
+        last = datetime.fromisoformat(last_checkin)
+    except (ValueError, TypeError):
+        return True
+    return datetime.fromisoformat(now) - last >= timedelta(seconds=HEARTBEAT_WRITE_SECONDS)
+
 def build_webhook_data(aid, msg, status, team, desc, role, now, old_status, changed):
     wh_data = {"agent_id": aid, "status_message": msg, "task_status": status, "team": team, "timestamp": now}
     if desc:
@@ -84,13 +244,13 @@ def build_webhook_data(aid, msg, status, team, desc, role, now, old_status, chan
         wh_data["previous_status"] = old_status
     return wh_data
 
-def send_webhooks(is_new, changed, status, data):
+def send_webhooks(is_new, changed, status, data, webhooks=None):
     if is_new:
-        trigger("agent_online", data)
+        trigger("agent_online", data, webhooks)
     else:
-        trigger("status_update", data)
+        trigger("status_update", data, webhooks)
         if changed:
-            trigger(f"status_changed_to_{status}", data)
+            trigger(f"status_changed_to_{status}", data, webhooks)
 
 def format_response(aid, status, msg, team, desc, role):
     parts = [f"Agent '{aid}' status updated successfully.", f"Status: {status}", f"Message: {msg}"]
@@ -112,3 +272,6 @@ def handle_get_status(args):
 def handle_list_agents(args):
     data = load_data()
     return [TextContent(type="text", text=json.dumps(data["agents"], indent=2))]
+
+def handle_rate_limit_stats(args):
+    return [TextContent(type="text", text=json.dumps(limiter.snapshot(), indent=2))]
@@ -12,9 +12,9 @@ def deliver(url, payload):
     except Exception as e:
         print(f"Webhook delivery failed for {url}: {str(e)}")
 
-def trigger(event_type, data):
-    agent_data = load_data()
-    webhooks = agent_data.get("webhooks", [])
+def trigger(event_type, data, webhooks=None, heartbeat=False):
+    if webhooks is None:
+        webhooks = load_data().get("webhooks", [])
     if not webhooks:
         return
 
@@ -23,5 +23,7 @@ def trigger(event_type, data):
     for webhook in webhooks:
         url = webhook.get("url")
         events = webhook.get("events", ["all"])
+        if heartbeat and not webhook.get("heartbeats", True):
+            continue
         if "all" in events or event_type in events:
             executor.submit(deliver, url, payload)
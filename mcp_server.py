@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 from fastmcp import FastMCP
-from lib.tool_handlers import handle_set_status, handle_get_status, handle_list_agents
+from lib.tool_handlers import handle_set_status_async, handle_heartbeat_async, handle_get_status, handle_list_agents, handle_rate_limit_stats, run_handler
 
 mcp = FastMCP("agent-dashboard")
 
 @mcp.tool
-def set_agent_status(
+async def set_agent_status(
     agent_id: str,
     status_message: str,
     task_status: str,
@@ -38,11 +38,26 @@ def set_agent_status(
         "description": description,
         "role": role
     }
-    result = handle_set_status(args)
+    result = await handle_set_status_async(args)
     return result[0].text
 
 @mcp.tool
-def get_agent_status(agent_id: str) -> str:
+async def heartbeat(agent_id: str) -> str:
+    """
+    Record a check-in for an agent without changing its status.
+    
+    Args:
+        agent_id: Unique identifier for the agent
+    
+    Returns:
+        A confirmation message, or a not-found message if the agent has never set its status
+    """
+    args = {"agent_id": agent_id}
+    result = await handle_heartbeat_async(args)
+    return result[0].text
+
+@mcp.tool
+async def get_agent_status(agent_id: str) -> str:
     """
     Get the current status of a specific agent.
     
@@ -53,11 +68,11 @@ def get_agent_status(agent_id: str) -> str:
         JSON string containing the agent's current status information
     """
     args = {"agent_id": agent_id}
-    result = handle_get_status(args)
+    result = await run_handler(handle_get_status, args)
     return result[0].text
 
 @mcp.tool
-def list_all_agents() -> str:
+async def list_all_agents() -> str:
     """
     Get a list of all registered agents and their statuses.
     
@@ -65,7 +80,20 @@ def list_all_agents() -> str:
         JSON string containing all agents and their status information
     """
     args = {}
-    result = handle_list_agents(args)
+    result = await run_handler(handle_list_agents, args)
+    return result[0].text
+
+@mcp.tool
+def get_rate_limit_stats() -> str:
+    """
+    Get counts of check-ins that were rate limited by this server.
+    
+    Returns:
+        JSON string with totals of allowed, throttled, coalesced and flushed check-ins,
+        the number of updates waiting to be flushed, and throttled counts per agent and per team
+    """
+    args = {}
+    result = handle_rate_limit_stats(args)
     return result[0].text
 
 if __name__ == "__main__":
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import requests
+from example_agent import connect, set_status, heartbeat
+
+STATUSES = ["working", "idle", "warning", "error"]
+
+def parse_weights(spec):
+    """'working=6,idle=3,warning=0.7,error=0.3' -> weights in STATUSES order"""
+    weights = dict.fromkeys(STATUSES, 0.0)
+    for part in spec.split(","):
+        status, _, weight = part.partition("=")
+        if status.strip() not in weights:
+            raise argparse.ArgumentTypeError(f"Unknown status: {status}")
+        weights[status.strip()] = float(weight)
+    return [weights[s] for s in STATUSES]
+
+class Stats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+        self.call_latency = []
+        self.visible_latency = []
+        self.webhook_lag = []
+        self.lock = threading.Lock()
+
+    def record_call(self, latency, outcome):
+        self.calls += 1
+        self.call_latency.append(latency)
+        if outcome == "error":
+            self.errors += 1
+        elif outcome == "throttled":
+            self.throttled += 1
+
+    def record_webhook(self, lag):
+        with self.lock:
+            self.webhook_lag.append(lag)
+
+class Dashboard:
+    """GET/POST against the dashboard, either over HTTP or through Flask's test client in-process"""
+
+    def __init__(self, url=None):
+        self.url = url
+        if not url:
+            import dashboard
+            self.client = dashboard.app.test_client()
+
+    def get_agents(self):
+        if self.url:
+            return requests.get(f"{self.url}/api/agents", timeout=10).json()
+        return json.loads(self.client.get('/api/agents').get_data())
+
+    def webhook(self, method, body):
+        if self.url:
+            requests.request(method, f"{self.url}/api/webhooks", json=body, timeout=10)
+        else:
+            self.client.open('/api/webhooks', method=method, json=body)
+
+def start_webhook_sink(stats, port):
+    class Sink(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            sent = datetime.fromisoformat(payload["data"]["timestamp"])
+            stats.record_webhook((datetime.now() - sent).total_seconds())
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Sink)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+async def virtual_agent(client, aid, args, weights, deadline, stats, probes):
+    rng = random.Random(aid)
+    status = rng.choices(STATUSES, weights)[0]
+    step = 0
+    # Spread first check-ins over one interval so agents don't arrive in lockstep
+    await asyncio.sleep(min(rng.uniform(0, args.heartbeat_interval), args.duration))
+
+    while time.monotonic() < deadline:
+        change = step == 0 or rng.random() < args.change_probability
+        if change:
+            status = rng.choices(STATUSES, weights)[0]
+            msg = f"Step {step}"
+        start = time.monotonic()
+        try:
+            text = await set_status(client, aid, status, msg) if change else await heartbeat(client, aid)
+            outcome = check_in_outcome(text)
+        except Exception:
+            outcome = "error"
+        # A rate limited change is saved later, if at all, so it isn't timed for visibility
+        if change and outcome == "ok":
+            probes[aid] = (msg, start)
+        stats.record_call(time.monotonic() - start, outcome)
+        step += 1
+
+        jitter = rng.uniform(-args.jitter, args.jitter) * args.heartbeat_interval
+        # Stop at the deadline rather than sleeping past it, so the run's elapsed time is the duration
+        await asyncio.sleep(max(0.0, min(args.heartbeat_interval + jitter, deadline - time.monotonic())))
+
+def check_in_outcome(text):
+    if "not found" in text:
+        return "error"
+    if "rate limited" in text:
+        return "throttled"
+    return "ok"
+
+async def run_session(url, agent_ids, connected, started, run_agent):
+    """One MCP session shared by agent_ids. Connects, then waits for every session to be ready before starting"""
+    async with connect(url) as client:
+        connected.set_result(None)
+        deadline = await started
+        await asyncio.gather(*(run_agent(client, aid, deadline) for aid in agent_ids))
+
+async def watch_visibility(dash, probes, stats, deadline, interval):
+    # Poll /api/agents like the dashboard does and time how long each status change took to appear
+    loop = asyncio.get_running_loop()
+    while time.monotonic() < deadline:
+        response = await loop.run_in_executor(None, dash.get_agents)
+        now = time.monotonic()
+        for agent in response.get("agents", []):
+            probe = probes.get(agent["id"])
+            if probe and agent.get("status_message") == probe[0]:
+                stats.visible_latency.append(now - probe[1])
+                del probes[agent["id"]]
+        await asyncio.sleep(interval)
+
+def summarize(name, values, unit_scale=1000, unit="ms"):
+    if not values:
+        return f"  {name}: no samples"
+    qs = statistics.quantiles(values, n=100) if len(values) > 1 else [values[0]] * 99
+    return (f"  {name}: {len(values)} samples, p50 {qs[49] * unit_scale:,.1f} {unit}, "
+            f"p95 {qs[94] * unit_scale:,.1f} {unit}, p99 {qs[98] * unit_scale:,.1f} {unit}")
+
+async def simulate(args):
+    weights = parse_weights(args.status_weights)
+    stats = Stats()
+    probes = {}
+    dash = Dashboard(args.dashboard_url)
+    sink = start_webhook_sink(stats, args.webhook_port)
+    sink_url = f"http://127.0.0.1:{sink.server_address[1]}/"
+    dash.webhook("POST", {"url": sink_url, "events": ["agent_online", "status_update"], "heartbeats": False})
+
+    mode = args.mcp_url or "in-process"
+    num_sessions = min(args.sessions or args.agents, args.agents)
+    print(f"Simulating {args.agents} agents over {num_sessions} MCP sessions for {args.duration}s against {mode} "
+          f"(check-in every {args.heartbeat_interval}s, {args.change_probability:.0%} status changes)")
+
+    def run_agent(client, aid, deadline):
+        return virtual_agent(client, aid, args, weights, deadline, stats, probes)
+
+    loop = asyncio.get_running_loop()
+    agent_ids = [f"sim-agent-{i}" for i in range(args.agents)]
+    connected = [loop.create_future() for _ in range(num_sessions)]
+    started = loop.create_future()
+    # Each session is entered and left in its own task, as the MCP client requires
+    sessions = [asyncio.create_task(run_session(args.mcp_url, agent_ids[i::num_sessions], connected[i], started, run_agent))
+                for i in range(num_sessions)]
+
+    try:
+        await asyncio.gather(*connected)
+        deadline = time.monotonic() + args.duration
+        start = time.monotonic()
+        started.set_result(deadline)
+        # The watcher runs on past the deadline to catch the last changes, so it isn't part of elapsed
+        watcher = asyncio.create_task(watch_visibility(dash, probes, stats, deadline + args.heartbeat_interval,
+                                                       args.poll_interval))
+        await asyncio.gather(*sessions)
+        elapsed = time.monotonic() - start
+        await watcher
+    finally:
+        for session in sessions:
+            session.cancel()
+        dash.webhook("DELETE", {"url": sink_url})
+        # Give in-flight webhook deliveries a moment before reporting
+        time.sleep(1)
+        sink.shutdown()
+
+    calls = max(stats.calls, 1)
+    print(f"\nCheck-ins: {stats.calls} in {elapsed:.1f}s ({stats.calls / elapsed:,.0f}/sec), "
+          f"{stats.errors} errors ({stats.errors / calls:.2%}), {stats.throttled} rate limited ({stats.throttled / calls:.2%})")
+    print(summarize("Tool call latency", stats.call_latency))
+    print(summarize("Change visible in /api/agents", stats.visible_latency))
+    if probes:
+        print(f"  {len(probes)} changes were not seen in /api/agents before the end (overwritten or still pending)")
+    print(summarize("Webhook delivery lag", stats.webhook_lag))
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with simulated agents")
+    parser.add_argument("--agents", type=int, default=1000, help="Number of virtual agents (default: 1000)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run (default: 30)")
+    parser.add_argument("--heartbeat-interval", type=float, default=5, help="Seconds between each agent's check-ins (default: 5)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Random variation of the interval, as a fraction (default: 0.2)")
+    parser.add_argument("--change-probability", type=float, default=0.1,
+                        help="Chance that a check-in changes status instead of being a heartbeat (default: 0.1)")
+    parser.add_argument("--status-weights", default="working=6,idle=3,warning=0.7,error=0.3",
+                        help="Relative likelihood of each status on a change")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="Number of MCP sessions shared round-robin by the agents (default: one per agent)")
+    parser.add_argument("--mcp-url", help="MCP server URL, e.g. http://localhost:8000/mcp (default: in-process)")
+    parser.add_argument("--dashboard-url", help="Dashboard URL, e.g. http://localhost:5000 (default: in-process)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between /api/agents polls (default: 0.5)")
+    parser.add_argument("--webhook-port", type=int, default=0, help="Port for the local webhook sink (default: any free port)")
+    parser.add_argument("--data-file", help="State file for in-process runs (default: a temporary file)")
+    args = parser.parse_args()
+
+    if not args.mcp_url:
+        # Keep in-process runs away from the real agent_data.json, and let every virtual agent through
+        import lib.data_io as data_io
+        import lib.rate_limit as rate_limit
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_io.backend = data_io.JsonFileBackend(args.data_file or Path(tmpdir) / "agent_data.json")
+            rate_limit.limiter.agent_limit = rate_limit.limiter.team_limit = (0, 0)
+            asyncio.run(simulate(args))
+    else:
+        asyncio.run(simulate(args))
+
+if __name__ == "__main__":
+    main()
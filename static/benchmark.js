@@ -0,0 +1,144 @@
+const STATUSES = ['working', 'idle', 'warning', 'error'];
+const LABELS = {working: 'Working', idle: 'Idle', warning: 'Warning', error: 'Error'};
+
+function benchParams() {
+    const q = new URLSearchParams(window.location.search);
+    return {
+        agents: parseInt(q.get('agents') || '2000', 10),
+        teams: parseInt(q.get('teams') || '20', 10),
+        changed: parseFloat(q.get('changed') || '0.05'),
+        iterations: parseInt(q.get('iterations') || '10', 10)
+    };
+}
+
+function syntheticAgent(i, now) {
+    const st = STATUSES[i % STATUSES.length];
+    return {
+        id: `agent-${i}`,
+        status_message: `Processing batch ${i}`,
+        task_status: st,
+        last_checkin: new Date(now - (i % 60) * 1000).toISOString(),
+        display_status: st,
+        display_color: 'green',
+        display_label: LABELS[st],
+        team: null,
+        breakdown_24h: {working: 60.0, idle: 25.0, warning: 10.0, error: 5.0, offline: 0.0}
+    };
+}
+
+function syntheticHistory(id, now, entries = 20) {
+    const hist = [];
+    for (let i = 0; i < entries; i++) {
+        const st = STATUSES[(i + id.length) % STATUSES.length];
+        hist.push({timestamp: new Date(now - (entries - i) * 120000).toISOString(), status: st, display_status: st, display_label: LABELS[st], message: `Step ${i}`});
+    }
+    return hist;
+}
+
+function syntheticFleet(p) {
+    const now = Date.now();
+    const agents = [];
+    const teams = [];
+    const unassigned = [];
+    const history = {};
+
+    for (let t = 0; t < p.teams; t++) {
+        teams.push({name: `Team ${t}`, agent_ids: [], agent_count: 0, status: 'working', color: 'green', label: 'Working'});
+    }
+
+    for (let i = 0; i < p.agents; i++) {
+        const ag = syntheticAgent(i, now);
+        history[ag.id] = syntheticHistory(ag.id, now);
+        // Every tenth agent is unassigned
+        if (i % 10 === 0 || teams.length === 0) {
+            unassigned.push(ag.id);
+        } else {
+            const tm = teams[i % teams.length];
+            ag.team = tm.name;
+            tm.agent_ids.push(ag.id);
+            tm.agent_count++;
+        }
+        agents.push(ag);
+    }
+
+    teams.forEach(tm => history[`team:${tm.name}`] = syntheticHistory(tm.name, now, 100));
+    return {data: {agents, teams, unassigned_agent_ids: unassigned}, history};
+}
+
+function mutateFleet(fleet, fraction, iteration) {
+    const count = Math.max(1, Math.round(fleet.data.agents.length * fraction));
+    const stride = Math.max(1, Math.floor(fleet.data.agents.length / count));
+    // Responses are freshly parsed JSON on every poll, so replace objects rather than edit them
+    const agents = fleet.data.agents.map((ag, i) => {
+        if (i % stride !== iteration % stride) return ag;
+        return {...ag, status_message: `Iteration ${iteration}`, last_checkin: new Date().toISOString()};
+    });
+    return {data: {...fleet.data, agents}, history: fleet.history};
+}
+
+function nextFrame() {
+    return new Promise(resolve => requestAnimationFrame(() => resolve()));
+}
+
+async function timeUntilPainted(fn) {
+    const start = performance.now();
+    fn();
+    document.getElementById('agents-container').offsetHeight;
+    // Visible cards are filled in by the IntersectionObserver before the next paint
+    await nextFrame();
+    await nextFrame();
+    return performance.now() - start;
+}
+
+function resetRenderState() {
+    cardSlots.forEach(slot => getCardObserver().unobserve(slot.el));
+    cardSlots.clear();
+    teamSections.clear();
+    document.getElementById('agents-container').innerHTML = '';
+}
+
+function renderFullRebuild() {
+    // What every refresh used to do: one HTML string holding every card
+    const byId = new Map(currentData.agents.map(ag => [ag.id, ag]));
+    const grid = ids => ids.map(id => byId.get(id)).map(ag => `<div class="agent-card ${ag.display_status}">${renderAgentCard(ag)}</div>`).join('');
+    const html = currentData.teams.map(tm => `<div class="team-section"><div class="team-agents"><div class="agents-grid">${grid(tm.agent_ids)}</div></div></div>`).join('');
+    document.getElementById('agents-container').innerHTML = html + `<div class="team-section"><div class="team-agents"><div class="agents-grid">${grid(currentData.unassigned_agent_ids)}</div></div></div>`;
+}
+
+function domSize() {
+    return document.getElementById('agents-container').getElementsByTagName('*').length;
+}
+
+async function runBenchmark() {
+    const p = benchParams();
+    let fleet = syntheticFleet(p);
+    const lines = [`${p.agents} agents, ${p.teams} teams, ${(p.changed * 100).toFixed(1)}% changed per refresh, ${p.iterations} refreshes`];
+    const avg = xs => xs.reduce((a, b) => a + b, 0) / xs.length;
+
+    currentData = fleet.data;
+    historyData = fleet.history;
+
+    const full = [];
+    for (let i = 0; i < p.iterations; i++) {
+        fleet = mutateFleet(fleet, p.changed, i);
+        currentData = fleet.data;
+        full.push(await timeUntilPainted(renderFullRebuild));
+    }
+    lines.push(`Full rebuild:        ${avg(full).toFixed(1)} ms/refresh, ${domSize()} DOM nodes`);
+
+    resetRenderState();
+    const initial = await timeUntilPainted(renderDashboard);
+    lines.push(`Incremental, first:  ${initial.toFixed(1)} ms, ${domSize()} DOM nodes`);
+
+    const incremental = [];
+    for (let i = 0; i < p.iterations; i++) {
+        fleet = mutateFleet(fleet, p.changed, i);
+        currentData = fleet.data;
+        incremental.push(await timeUntilPainted(renderDashboard));
+    }
+    lines.push(`Incremental refresh: ${avg(incremental).toFixed(1)} ms/refresh, ${domSize()} DOM nodes`);
+
+    document.getElementById('bench-results').textContent = lines.join('\n');
+}
+
+runBenchmark();
@@ -9,6 +9,9 @@ let previousStates = {};
 let notifications = [];
 let notificationPermission = 'default';
 let currentData = null;
+let cardSlots = new Map();
+let teamSections = new Map();
+let cardObserver = null;
 
 function initTheme() {
     const theme = localStorage.getItem('theme') || 'light';
@@ -87,7 +90,7 @@ function renderRecentMessages(key, max = 5) {
         const msg = escapeHtml(e.message || 'No message');
         const status = e.display_status || e.status || 'unknown';
         const label = e.display_label || status;
-        return `<div class="recent-message-item ${status}"><div class="recent-message-header"><span class="status-dot ${status}"></span><span class="recent-message-status">${label}</span><span class="recent-message-time">${ago}</span></div><div class="recent-message-text">${msg}</div></div>`;
+        return `<div class="recent-message-item ${status}"><div class="recent-message-header"><span class="status-dot ${status}"></span><span class="recent-message-status">${label}</span><span class="recent-message-time" data-ts="${e.timestamp}">${ago}</span></div><div class="recent-message-text">${msg}</div></div>`;
     }).join('');
 
     return `<div class="recent-messages-list">${items}</div>`;
@@ -110,7 +113,87 @@ function render24hBreakdown(bd) {
 
 function renderAgentCard(ag) {
     const esc = s => escapeHtml(s).replace(/'/g, "\\'");
-    return `<div class="agent-card ${ag.display_status}"><div class="agent-header"><div class="agent-id"><span class="status-dot ${ag.display_status}"></span><strong>${escapeHtml(ag.id)}</strong></div><div class="agent-header-actions"><button class="delete-btn" onclick="deleteAgent('${esc(ag.id)}', event)" title="Delete agent">✕</button><div class="status-badge ${ag.display_status}">${escapeHtml(ag.display_label)}</div></div></div><div class="agent-message">${escapeHtml(ag.status_message || 'No status message')}</div><div class="agent-recent-messages"><div class="recent-messages-label">Recent Messages:</div>${renderRecentMessages(ag.id)}</div><div class="agent-breakdown"><div class="breakdown-label-header">Last 24h Breakdown:</div>${render24hBreakdown(ag.breakdown_24h)}</div><div class="agent-history"><div class="history-label">History:</div>${renderHistory(ag.id)}</div><div class="agent-footer"><span class="checkin-time" title="${formatDateTime(ag.last_checkin)}">${timeAgo(ag.last_checkin)}</span></div></div>`;
+    return `<div class="agent-header"><div class="agent-id"><span class="status-dot ${ag.display_status}"></span><strong>${escapeHtml(ag.id)}</strong></div><div class="agent-header-actions"><button class="delete-btn" onclick="deleteAgent('${esc(ag.id)}', event)" title="Delete agent">✕</button><div class="status-badge ${ag.display_status}">${escapeHtml(ag.display_label)}</div></div></div><div class="agent-message">${escapeHtml(ag.status_message || 'No status message')}</div><div class="agent-recent-messages"><div class="recent-messages-label">Recent Messages:</div>${renderRecentMessages(ag.id)}</div><div class="agent-breakdown"><div class="breakdown-label-header">Last 24h Breakdown:</div>${render24hBreakdown(ag.breakdown_24h)}</div><div class="agent-history"><div class="history-label">History:</div>${renderHistory(ag.id)}</div><div class="agent-footer"><span class="checkin-time" data-ts="${ag.last_checkin}" title="${formatDateTime(ag.last_checkin)}">${timeAgo(ag.last_checkin)}</span></div>`;
+}
+
+function historySig(key) {
+    const hist = historyData[key] || [];
+    const last = hist[hist.length - 1];
+    return last ? `${hist.length}|${last.timestamp}|${last.display_status}` : '';
+}
+
+function cardSig(ag) {
+    return JSON.stringify([ag.display_status, ag.display_label, ag.status_message, ag.last_checkin, ag.breakdown_24h, historySig(ag.id)]);
+}
+
+// Cards are keyed by agent ID and only filled in while near the viewport;
+// off-screen cards are emptied placeholders that keep their last height.
+function getCardObserver() {
+    if (!cardObserver) {
+        cardObserver = new IntersectionObserver(entries => {
+            entries.forEach(en => {
+                const slot = cardSlots.get(en.target.dataset.agentId);
+                if (!slot) return;
+                slot.visible = en.isIntersecting;
+                if (slot.visible) renderCardSlot(slot);
+                else releaseCardSlot(slot);
+            });
+        }, {rootMargin: '600px 0px'});
+    }
+    return cardObserver;
+}
+
+function patchCard(ag) {
+    let slot = cardSlots.get(ag.id);
+    if (!slot) {
+        const el = document.createElement('div');
+        el.dataset.agentId = ag.id;
+        slot = {el, agent: ag, sig: null, visible: false};
+        cardSlots.set(ag.id, slot);
+        getCardObserver().observe(el);
+    }
+    slot.agent = ag;
+    const cls = `agent-card ${ag.display_status}`;
+    if (slot.el.className !== cls) slot.el.className = cls;
+    if (slot.visible) renderCardSlot(slot);
+    return slot.el;
+}
+
+function renderCardSlot(slot) {
+    const sig = cardSig(slot.agent);
+    if (sig === slot.sig) return;
+    slot.el.innerHTML = renderAgentCard(slot.agent);
+    slot.el.style.minHeight = '';
+    slot.sig = sig;
+}
+
+function releaseCardSlot(slot) {
+    if (slot.sig === null || !slot.el.isConnected) return;
+    slot.el.style.minHeight = `${slot.el.offsetHeight}px`;
+    slot.el.innerHTML = '';
+    slot.sig = null;
+}
+
+function pruneCardSlots(byId) {
+    cardSlots.forEach((slot, id) => {
+        if (byId.has(id)) return;
+        getCardObserver().unobserve(slot.el);
+        cardSlots.delete(id);
+    });
+}
+
+function syncChildren(parent, children) {
+    children.forEach((child, i) => {
+        if (parent.children[i] !== child) parent.insertBefore(child, parent.children[i] || null);
+    });
+    while (parent.children.length > children.length) parent.lastElementChild.remove();
+}
+
+function refreshTimes() {
+    document.querySelectorAll('#agents-container [data-ts]').forEach(el => {
+        const ago = timeAgo(el.dataset.ts);
+        if (el.textContent !== ago) el.textContent = ago;
+    });
 }
 
 function filterAgent(ag) {
@@ -119,42 +202,95 @@ function filterAgent(ag) {
     return true;
 }
 
+function renderTeamHeader(tm, count, collapsed) {
+    const esc = s => escapeHtml(s).replace(/'/g, "\\'");
+    const chevron = collapsed ? '▶' : '▼';
+    return `<div class="team-info" onclick="toggleTeam('${esc(tm.name)}')"><span class="team-chevron">${chevron}</span><span class="status-dot ${tm.status}"></span><h2 class="team-name">${escapeHtml(tm.name)}</h2><span class="team-count">(${count} agent${count !== 1 ? 's' : ''})</span></div><div class="team-header-right"><button class="delete-btn team-delete-btn" onclick="deleteTeam('${esc(tm.name)}', event)" title="Delete team and all agents">✕</button><div class="status-badge ${tm.status}">${escapeHtml(tm.label)}</div></div>`;
+}
+
+function renderUnassignedHeader(count) {
+    return `<div class="team-info"><h2 class="team-name">Unassigned Agents</h2><span class="team-count">(${count} agent${count !== 1 ? 's' : ''})</span></div>`;
+}
+
+function patchSection(key, headerCls, headerHtml, historyKey, agents, collapsed) {
+    let sec = teamSections.get(key);
+    if (!sec) {
+        const el = document.createElement('div');
+        el.className = 'team-section';
+        el.innerHTML = `<div class="team-header"></div>${historyKey ? '<div class="team-history-section"></div>' : ''}<div class="team-agents"><div class="agents-grid"></div></div>`;
+        sec = {el, header: el.querySelector('.team-header'), history: el.querySelector('.team-history-section'), agentsEl: el.querySelector('.team-agents'), grid: el.querySelector('.agents-grid'), headerSig: null, historySig: null};
+        teamSections.set(key, sec);
+    }
+
+    const headerSig = headerCls + headerHtml;
+    if (sec.headerSig !== headerSig) {
+        sec.header.className = `team-header ${headerCls}`;
+        sec.header.innerHTML = headerHtml;
+        sec.headerSig = headerSig;
+    }
+
+    if (historyKey) {
+        const hSig = historySig(historyKey);
+        if (sec.historySig !== hSig) {
+            sec.history.innerHTML = `<div class="history-label">Team History:</div>${renderHistory(historyKey, 30)}`;
+            sec.historySig = hSig;
+        }
+    }
+
+    sec.agentsEl.classList.toggle('collapsed', collapsed);
+    // Collapsed teams keep no cards in the DOM
+    syncChildren(sec.grid, collapsed ? [] : agents.map(patchCard));
+    return sec.el;
+}
+
+function showMessage(cont, cls, text) {
+    cont.innerHTML = `<div class="${cls}">${text}</div>`;
+}
+
 function renderDashboard() {
     if (!currentData) return;
 
     const cont = document.getElementById('agents-container');
     const teams = currentData.teams || [];
-    const unassigned = currentData.unassigned_agents || [];
+    const byId = new Map((currentData.agents || []).map(ag => [ag.id, ag]));
+    const lookup = ids => (ids || []).map(id => byId.get(id)).filter(Boolean);
+    const unassigned = lookup(currentData.unassigned_agent_ids);
     const total = currentData.agents ? currentData.agents.length : 0;
+    pruneCardSlots(byId);
 
     if (total === 0) {
-        cont.innerHTML = '<div class="no-agents">No agents registered yet</div>';
+        showMessage(cont, 'no-agents', 'No agents registered yet');
         return;
     }
 
-    let html = '';
-    let visible = 0;
+    const sections = [];
+    const liveKeys = new Set();
 
     teams.forEach(tm => {
-        const filtered = tm.agents.filter(filterAgent);
+        const filtered = lookup(tm.agent_ids).filter(filterAgent);
         if (filtered.length === 0) return;
 
-        visible += filtered.length;
-        const collapsed = collapsedTeams.has(tm.name);
-        const chevron = collapsed ? '▶' : '▼';
         const key = `team:${tm.name}`;
-        const esc = s => escapeHtml(s).replace(/'/g, "\\'");
-
-        html += `<div class="team-section"><div class="team-header ${tm.status}"><div class="team-info" onclick="toggleTeam('${esc(tm.name)}')"><span class="team-chevron">${chevron}</span><span class="status-dot ${tm.status}"></span><h2 class="team-name">${escapeHtml(tm.name)}</h2><span class="team-count">(${filtered.length} agent${filtered.length !== 1 ? 's' : ''})</span></div><div class="team-header-right"><button class="delete-btn team-delete-btn" onclick="deleteTeam('${esc(tm.name)}', event)" title="Delete team and all agents">✕</button><div class="status-badge ${tm.status}">${escapeHtml(tm.label)}</div></div></div><div class="team-history-section"><div class="history-label">Team History:</div>${renderHistory(key, 30)}</div><div class="team-agents ${collapsed ? 'collapsed' : ''}"><div class="agents-grid">${filtered.map(renderAgentCard).join('')}</div></div></div>`;
+        const collapsed = collapsedTeams.has(tm.name);
+        liveKeys.add(key);
+        sections.push(patchSection(key, tm.status, renderTeamHeader(tm, filtered.length, collapsed), key, filtered, collapsed));
     });
 
     const filtUnassigned = unassigned.filter(filterAgent);
     if (filtUnassigned.length > 0) {
-        visible += filtUnassigned.length;
-        html += `<div class="team-section"><div class="team-header unassigned"><div class="team-info"><h2 class="team-name">Unassigned Agents</h2><span class="team-count">(${filtUnassigned.length} agent${filtUnassigned.length !== 1 ? 's' : ''})</span></div></div><div class="team-agents"><div class="agents-grid">${filtUnassigned.map(renderAgentCard).join('')}</div></div></div>`;
+        liveKeys.add('unassigned');
+        sections.push(patchSection('unassigned', 'unassigned', renderUnassignedHeader(filtUnassigned.length), null, filtUnassigned, false));
+    }
+
+    teamSections.forEach((_, key) => { if (!liveKeys.has(key)) teamSections.delete(key); });
+
+    if (sections.length === 0) {
+        showMessage(cont, 'no-agents', 'No agents match the current filters');
+        return;
     }
 
-    cont.innerHTML = visible === 0 ? '<div class="no-agents">No agents match the current filters</div>' : html;
+    syncChildren(cont, sections);
+    refreshTimes();
 }
 
 async function updateHistory() {
@@ -414,20 +550,23 @@ function renderNotificationList() {
     }).join('');
 }
 
-document.addEventListener('click', e => {
-    const panel = document.getElementById('notification-panel');
-    const btn = document.getElementById('notification-button');
+// The benchmark page reuses the renderers without polling the API
+if (!window.DASHBOARD_BENCHMARK) {
+    document.addEventListener('click', e => {
+        const panel = document.getElementById('notification-panel');
+        const btn = document.getElementById('notification-button');
 
-    if (!panel.classList.contains('hidden') && !panel.contains(e.target) && !btn.contains(e.target)) {
-        toggleNotificationPanel();
-    }
-});
-
-initTheme();
-loadConfig();
-loadNotifications();
-requestNotificationPermission();
-updateAgents();
-setInterval(updateAgents, REFRESH_INTERVAL);
-setupEventListeners();
-document.getElementById('theme-toggle').addEventListener('click', toggleTheme);
+        if (!panel.classList.contains('hidden') && !panel.contains(e.target) && !btn.contains(e.target)) {
+            toggleNotificationPanel();
+        }
+    });
+
+    initTheme();
+    loadConfig();
+    loadNotifications();
+    requestNotificationPermission();
+    updateAgents();
+    setInterval(updateAgents, REFRESH_INTERVAL);
+    setupEventListeners();
+    document.getElementById('theme-toggle').addEventListener('click', toggleTheme);
+}